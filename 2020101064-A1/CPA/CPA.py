@@ -1,6 +1,736 @@
+import hashlib
+import importlib.machinery
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import threading
+import warnings
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+from weakref import WeakValueDictionary, finalize
+
+
+try:
+    import numpy as np
+except ImportError:  # vectorized paths fall back to Python ints
+    np = None
+
+
+_op_counts = None  # OperationCounts filled while count_operations is active
+
+
+class OperationCounts:
+    fields = ('exponentiations', 'prg_calls', 'ggm_levels', 'bits_xored',
+              'cache_hits', 'cache_misses')
+    __slots__ = fields + ('thread',)
+
+    def __init__(self):
+        """
+        Work done inside a `count_operations` block: modular
+        exponentiations, PRG invocations, GGM levels walked, bits XORed, and
+        hits / misses of the orbit and GGM node caches
+        """
+        object.__setattr__(self, 'thread', threading.get_ident())
+        self.exponentiations = 0
+        self.prg_calls = 0
+        self.ggm_levels = 0
+        self.bits_xored = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __setattr__(self, name, value):
+        # work of other threads (the PadPool worker, the keystream prefetch)
+        # is not part of the block
+        if threading.get_ident() == self.thread:
+            object.__setattr__(self, name, value)
+
+    def add(self, counts: dict):
+        """
+        Add counts gathered elsewhere, e.g. by a pool worker process
+        :param counts: field -> count, as given by `as_dict`
+        :type counts: dict
+        """
+        for name, value in counts.items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.fields}
+
+    def __repr__(self) -> str:
+        return 'OperationCounts(%s)' % ', '.join(
+            '%s=%d' % item for item in self.as_dict().items())
+
+
+@contextmanager
+def count_operations() -> Iterator[OperationCounts]:
+    """
+    Count the operations performed by the primitives of this module while
+    the block runs, e.g.
+
+        with count_operations() as counts:
+            CPA(...).enc(message, r)
+        counts.exponentiations
+
+    Only the thread that opened the block is counted, together with the
+    PRF worker processes it uses, whose counts come back with their
+    results; background threads (the PadPool worker, the keystream
+    prefetch of Eavesdrop.enc_stream) are not. Open blocks from one thread
+    at a time. A nested block's counts are added to the enclosing one when
+    it exits.
+    """
+    global _op_counts
+    outer = _op_counts
+    counts = _op_counts = OperationCounts()
+
+    try:
+        yield counts
+    finally:
+        _op_counts = outer
+        if outer is not None:
+            outer.add(counts.as_dict())
+
+
+def xor_kernel(data, pad, num_bits: Optional[int] = None):
+    """
+    XOR data with a keystream pad in machine words rather than per bit.
+    Packed ints are XORed directly; bytes / bytearray are XORed as big
+    ints over len(data) bytes of the pad; NumPy uint8 arrays use
+    np.bitwise_xor over len(data) elements of the pad.
+    :param data: message or ciphertext
+    :type data: int | bytes | np.ndarray
+    :param pad: keystream, at least as long as data (IndexError otherwise)
+    :type pad: int | bytes | np.ndarray
+    :param num_bits: bit length of packed int operands, for counting
+    :type num_bits: int
+    """
+    if isinstance(data, int):
+        if _op_counts is not None:
+            _op_counts.bits_xored += (num_bits if num_bits is not None
+                                      else max(data.bit_length(),
+                                               pad.bit_length()))
+        return data ^ pad
+
+    if len(pad) < len(data):
+        raise IndexError('pad shorter than the data')
+
+    if _op_counts is not None:
+        _op_counts.bits_xored += 8 * len(data)
+
+    if np is not None and isinstance(data, np.ndarray):
+        return np.bitwise_xor(data, pad[:len(data)])
+
+    return (int.from_bytes(data, 'big')
+            ^ int.from_bytes(pad[:len(data)], 'big')).to_bytes(len(data), 'big')
+
+
+def xor_bit_strings(str_1: str, str_2: str) -> str:
+    """
+    XOR two '0'/'1' bit-strings over the length of str_1 through
+    `xor_kernel`
+    :param str_1: keystream bit-string
+    :type str_1: str
+    :param str_2: data bit-string, at least as long as str_1
+    :type str_2: str
+    """
+    num_bits = len(str_1)
+    if not num_bits:
+        return ''
+    if len(str_2) < num_bits:
+        raise IndexError('bit-string shorter than the keystream')
+
+    return format(xor_kernel(int(str_1, 2), int(str_2[:num_bits], 2),
+                             num_bits), '0%db' % num_bits)
+
+
+_PACKED_HEADER = struct.Struct('>Q')  # bit length of a PackedBits on the wire
+
+
+class PackedBits:
+    __slots__ = ('value', 'num_bits')
+
+    def __init__(self, value: int, num_bits: int):
+        """
+        A bit-string of `num_bits` bits held as one int, most significant
+        bit first: the compact form of the '0'/'1' strings the schemes
+        exchange. Every scheme takes it wherever it takes a bit-string and
+        then answers with PackedBits as well. On the wire (`to_bytes`) it is
+        a big-endian uint64 bit length followed by the bits, most significant
+        first, zero padded to a whole byte.
+        :param value: the bits as an integer
+        :type value: int
+        :param num_bits: bit length, leading zero bits included
+        :type num_bits: int
+        """
+        if value < 0 or value.bit_length() > num_bits:
+            raise ValueError('%d does not fit in %d bits' % (value, num_bits))
+
+        self.value = value
+        self.num_bits = num_bits
+
+    @classmethod
+    def from_str(cls, bits: str) -> 'PackedBits':
+        """
+        Pack a legacy '0'/'1' bit-string
+        :param bits: bit-string
+        :type bits: str
+        """
+        if not isinstance(bits, str):
+            raise TypeError('expected a bit-string, not %s'
+                            % type(bits).__name__)
+        return cls(int(bits, 2) if bits else 0, len(bits))
+
+    def to_str(self) -> str:
+        """
+        The legacy '0'/'1' bit-string
+        """
+        if not self.num_bits:
+            return ''
+        return format(self.value, '0%db' % self.num_bits)
+
+    @classmethod
+    def from_blocks(cls, blocks: list[int], block_bits: int) -> 'PackedBits':
+        """
+        Concatenate blocks of `block_bits` bits each
+        :param blocks: block values, first block most significant
+        :type blocks: list[int]
+        :param block_bits: bits per block
+        :type block_bits: int
+        """
+        num_bits = len(blocks) * block_bits
+        if not num_bits:
+            return cls(0, 0)
+
+        if block_bits % 8 == 0:
+            width = block_bits // 8
+            value = int.from_bytes(
+                b''.join(block.to_bytes(width, 'big') for block in blocks),
+                'big')
+        else:
+            value = int(''.join(format(block, '0%db' % block_bits)
+                                for block in blocks), 2)
+
+        return cls(value, num_bits)
+
+    def blocks(self, block_bits: int) -> list[int]:
+        """
+        Values of the complete blocks of `block_bits` bits, most significant
+        first; trailing bits that do not fill a block are left out
+        :param block_bits: bits per block
+        :type block_bits: int
+        """
+        count = self.num_bits // block_bits
+        if not count:
+            return []
+
+        if block_bits % 8 == 0:
+            width = block_bits // 8
+            value = self.value >> (self.num_bits - count * block_bits)
+            data = value.to_bytes(count * width, 'big')
+            return [int.from_bytes(data[i: i + width], 'big')
+                    for i in range(0, len(data), width)]
+
+        bits = self.to_str()
+        return [int(bits[i * block_bits: (i + 1) * block_bits], 2)
+                for i in range(count)]
+
+    def to_bytes(self) -> bytes:
+        """
+        Wire format: uint64 bit length, then the zero padded bits
+        """
+        pad = -self.num_bits % 8
+        payload = (self.value << pad).to_bytes((self.num_bits + pad) // 8, 'big')
+        return _PACKED_HEADER.pack(self.num_bits) + payload
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'PackedBits':
+        """
+        Parse the wire format written by `to_bytes`
+        :param data: length header and packed bits
+        :type data: bytes
+        """
+        if len(data) < _PACKED_HEADER.size:
+            raise ValueError('packed bits shorter than their length header')
+
+        num_bits, = _PACKED_HEADER.unpack_from(data)
+        pad = -num_bits % 8
+        if len(data) != _PACKED_HEADER.size + (num_bits + pad) // 8:
+            raise ValueError('%d payload bytes do not hold %d bits'
+                             % (len(data) - _PACKED_HEADER.size, num_bits))
+
+        value = int.from_bytes(data[_PACKED_HEADER.size:], 'big')
+        if value & ((1 << pad) - 1):
+            raise ValueError('padding bits are not zero')
+
+        return cls(value >> pad, num_bits)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.num_bits)
+            if step != 1:
+                raise ValueError('PackedBits slices take no step')
+            stop = max(start, stop)
+            mask = (1 << (stop - start)) - 1
+            return PackedBits((self.value >> (self.num_bits - stop)) & mask,
+                              stop - start)
+
+        if index < 0:
+            index += self.num_bits
+        if not 0 <= index < self.num_bits:
+            raise IndexError('bit index out of range')
+        return (self.value >> (self.num_bits - 1 - index)) & 1
+
+    def __add__(self, other: 'PackedBits') -> 'PackedBits':
+        return PackedBits((self.value << other.num_bits) | other.value,
+                          self.num_bits + other.num_bits)
+
+    def __len__(self) -> int:
+        return self.num_bits
+
+    def __eq__(self, other) -> bool:
+        # PackedBits of another module compare by their bits too
+        value = getattr(other, 'value', None)
+        num_bits = getattr(other, 'num_bits', None)
+        if not (isinstance(value, int) and isinstance(num_bits, int)):
+            return NotImplemented
+        return (self.value, self.num_bits) == (value, num_bits)
+
+    def __hash__(self) -> int:
+        return hash((self.value, self.num_bits))
+
+    def __bytes__(self) -> bytes:
+        return self.to_bytes()
+
+    def __str__(self) -> str:
+        return self.to_str()
+
+    def __repr__(self) -> str:
+        return 'PackedBits(0x%x, num_bits=%d)' % (self.value, self.num_bits)
+
+
+def _adopt_bits(bits):
+    """
+    `bits` as a PackedBits of this module when it is a PackedBits of any
+    module, otherwise the bit-string unchanged. Every assignment file has
+    its own PackedBits class, so one made by another module is recognised
+    by its `value` and `num_bits` and rebuilt here.
+    :param bits: bit-string or PackedBits
+    :type bits: str | PackedBits
+    """
+    if isinstance(bits, (str, PackedBits)):
+        return bits
+
+    value = getattr(bits, 'value', None)
+    num_bits = getattr(bits, 'num_bits', None)
+    if isinstance(value, int) and isinstance(num_bits, int):
+        return PackedBits(value, num_bits)
+
+    raise TypeError('expected a bit-string or PackedBits, not %s'
+                    % type(bits).__name__)
+
+
+_FULL_TABLE_LIMIT = 1 << 16  # largest group order tabulated exponent by exponent
+_WINDOW_BITS = 6
+_ORBIT_CACHE_SIZE = 1024  # cached (seed, g, p) orbits
+_LANE_LIMIT = 1 << 32  # uint64 lanes hold products of residues below 2^32
+_JUMP_TABLE_LIMIT = 1 << 20  # largest p given successor / jump tables
+_JUMP_TABLE_ENTRIES = 1 << 23  # bound on p · levels stored per (g, p)
+_JUMP_TABLE_GROUPS = 2  # groups keeping jump tables at once
+_JUMP_MIN_STEPS = 64  # shorter seeks step directly, without tables
+_GROUP_CACHE_SIZE = 8  # unused groups whose engine and context stay alive
+
+
+def _brent(f, y: int) -> tuple[int, int]:
+    """
+    Tail length μ and cycle length λ of the sequence y, f(y), f(f(y)), ...
+    with Brent's algorithm; shared by PRG.orbit (f = g^y) and the seek
+    tables of FixedBaseExp (f = successor table lookup)
+    :param f: step function
+    :type f: Callable[[int], int]
+    :param y: starting state
+    :type y: int
+    """
+    # cycle length: the hare runs ahead in windows of doubling size
+    power = cycle_length = 1
+    tortoise = y
+    hare = f(y)
+    while tortoise != hare:
+        if power == cycle_length:
+            tortoise = hare
+            power *= 2
+            cycle_length = 0
+        hare = f(hare)
+        cycle_length += 1
+
+    # tail length: walk two pointers λ apart until they meet
+    tortoise = hare = y
+    for i in range(cycle_length):
+        hare = f(hare)
+    tail_length = 0
+    while tortoise != hare:
+        tortoise = f(tortoise)
+        hare = f(hare)
+        tail_length += 1
+
+    return tail_length, cycle_length
+
+
+class FixedBaseExp:
+    _engines = WeakValueDictionary()  # (g, p) -> engine, while referenced
+    _recent = OrderedDict()  # recently shared engines kept alive, LRU first
+    _jump_groups = OrderedDict()  # engines holding jump tables, LRU first
+
+    def __init__(self, generator: int, prime_field: int):
+        """
+        Fixed-base exponentiation g^e (mod p) served from precomputed tables.
+        Use `FixedBaseExp.shared` so that every PRG of this module on the
+        same group reuses the same tables.
+        :param generator: g
+        :type generator: int
+        :param prime_field: p
+        :type prime_field: int
+        """
+        self.generator = generator
+        self.prime_field = prime_field
+
+        # g^(p-1) = 1 (mod p) lets exponents be reduced modulo p - 1
+        self.order = None
+        if prime_field > 1 and pow(generator, prime_field - 1, prime_field) == 1:
+            self.order = prime_field - 1
+
+        self.table = None
+        self.lane_table = None  # NumPy copy of table, built by pow_lanes
+        self.windows = []
+        self.extend_lock = threading.Lock()  # pad workers share the engine
+        self.jumps = []  # jumps[k][y] = state 2^k steps after y, built lazily
+        self.cycles = OrderedDict()  # y -> (tail, cycle length), see _cycle
+
+        if self.order is not None and self.order <= _FULL_TABLE_LIMIT:
+            # table[e] = g^e (mod p) for every reduced exponent
+            self.table = [1] * self.order
+            for e in range(1, self.order):
+                self.table[e] = self.table[e - 1] * generator % prime_field
+        elif self.order is not None:
+            self._extend(-(-self.order.bit_length() // _WINDOW_BITS))
+
+    @classmethod
+    def shared(cls, generator: int, prime_field: int) -> 'FixedBaseExp':
+        """
+        Return the engine for (g, p), building it on first use. An engine
+        lives while a primitive references it, and the _GROUP_CACHE_SIZE
+        most recently shared ones are kept even when nothing does.
+        :param generator: g
+        :type generator: int
+        :param prime_field: p
+        :type prime_field: int
+        """
+        key = (generator, prime_field)
+        engine = cls._engines.get(key)
+        if engine is None:
+            engine = cls(generator, prime_field)
+            cls._engines[key] = engine
+
+        cls._recent[key] = engine
+        cls._recent.move_to_end(key)
+        if len(cls._recent) > _GROUP_CACHE_SIZE:
+            cls._recent.popitem(last=False)
+
+        return engine
+
+    def _extend(self, num_windows: int):
+        """
+        Grow the comb so that windows[k][d] = g^(d · 2^(w·k)) (mod p)
+        covers exponents of `num_windows` windows
+        :param num_windows: number of w-bit windows required
+        :type num_windows: int
+        """
+        p = self.prime_field
+
+        with self.extend_lock:
+            if self.windows:
+                base = self.windows[-1][-1] * self.windows[-1][1] % p
+            else:
+                base = self.generator % p
+
+            while len(self.windows) < num_windows:
+                row = [1] * (1 << _WINDOW_BITS)
+                for d in range(1, 1 << _WINDOW_BITS):
+                    row[d] = row[d - 1] * base % p
+                self.windows.append(row)
+                base = row[-1] * base % p
+
+    def pow(self, exponent: int) -> int:
+        """
+        Compute g^exponent (mod p)
+        :param exponent: non-negative exponent e
+        :type exponent: int
+        """
+        if _op_counts is not None:
+            _op_counts.exponentiations += 1
+
+        if self.order is not None:
+            exponent %= self.order
+
+        if self.table is not None:
+            return self.table[exponent]
+
+        num_windows = -(-exponent.bit_length() // _WINDOW_BITS)
+        if num_windows > len(self.windows):
+            self._extend(num_windows)
+
+        p = self.prime_field
+        mask = (1 << _WINDOW_BITS) - 1
+        result = 1
+        k = 0
+
+        while exponent:
+            digit = exponent & mask
+            if digit:
+                result = result * self.windows[k][digit] % p
+            exponent >>= _WINDOW_BITS
+            k += 1
+
+        return result % p
+
+    def pow_lanes(self, exponents: 'np.ndarray') -> 'np.ndarray':
+        """
+        Compute g^e (mod p) lane-wise over a NumPy uint64 array of reduced
+        exponents; requires p < 2^32 and a known order
+        :param exponents: exponents in [0, p - 1)
+        :type exponents: np.ndarray
+        """
+        if _op_counts is not None:
+            _op_counts.exponentiations += len(exponents)
+
+        if self.table is not None:
+            if self.lane_table is None:
+                self.lane_table = np.array(self.table, dtype=np.uint64)
+            return self.lane_table[exponents]
+
+        p = np.uint64(self.prime_field)
+        one = np.uint64(1)
+        result = np.ones_like(exponents)
+        base = np.full_like(exponents, self.generator % self.prime_field)
+        exponents = exponents.copy()
+
+        # square-and-multiply on every lane at once
+        for i in range(self.order.bit_length()):
+            odd = (exponents & one).astype(bool)
+            result = np.where(odd, result * base % p, result)
+            base = base * base % p
+            exponents >>= one
+
+        return result
+
+    def _cycle(self, y: int) -> tuple[int, int]:
+        """
+        Tail and cycle length of the orbit of y ∈ Z_p, found with _brent on
+        the successor table jumps[0] and cached per engine
+        :param y: starting state in Z_p
+        :type y: int
+        """
+        cached = self.cycles.get(y)
+        if cached is not None:
+            return cached
+
+        tail_length, cycle_length = _brent(self.jumps[0].__getitem__, y)
+
+        if len(self.cycles) >= _ORBIT_CACHE_SIZE:
+            self.cycles.popitem(last=False)
+        self.cycles[y] = (tail_length, cycle_length)
+
+        return tail_length, cycle_length
+    def iterate(self, y: int, steps: int) -> int:
+        """
+        State after `steps` applications of y -> g^y (mod p). For p up to
+        2^20 and at least _JUMP_MIN_STEPS steps this goes through
+        binary-lifting jump tables shared by the PRGs using this engine,
+        kept for the _JUMP_TABLE_GROUPS most recently seeking groups;
+        shorter seeks and larger groups step one exponentiation at a time.
+        An orbit in Z_p has at most p states, so a seek of p or more steps
+        is first reduced modulo the cycle of its orbit (O(p) once per start
+        state, cached). The seek is then O(log p) table lookups, plus at
+        most p / 2^levels top-level jumps where p · levels reaches
+        _JUMP_TABLE_ENTRIES.
+        :param y: starting state
+        :type y: int
+        :param steps: number of steps to take
+        :type steps: int
+        """
+        if steps <= 0:
+            return y
+
+        p = self.prime_field
+        if p > _JUMP_TABLE_LIMIT or steps < _JUMP_MIN_STEPS:
+            for i in range(steps):
+                y = self.pow(y)
+            return y
+
+        # land in Z_p, the domain the tables are defined on
+        y = self.pow(y)
+        steps -= 1
+
+        groups = FixedBaseExp._jump_groups
+        groups[id(self)] = self
+        groups.move_to_end(id(self))
+        if len(groups) > _JUMP_TABLE_GROUPS:
+            groups.popitem(last=False)[1].jumps = []
+
+        if not self.jumps:
+            self.jumps.append(array('I', map(self.pow, range(p))))
+
+        if steps >= p:
+            tail_length, cycle_length = self._cycle(y)
+            steps = tail_length + (steps - tail_length) % cycle_length
+
+        max_levels = max(1, _JUMP_TABLE_ENTRIES // p)
+        while len(self.jumps) < min(steps.bit_length(), max_levels):
+            prev = self.jumps[-1]
+            self.jumps.append(array('I', (prev[z] for z in prev)))
+
+        levels = len(self.jumps)
+        k = 0
+        while steps and k < levels:
+            if steps & 1:
+                y = self.jumps[k][y]
+            steps >>= 1
+            k += 1
+
+        # what is left is a multiple of 2^levels: two top-level jumps each
+        top = self.jumps[-1]
+        for i in range(steps):
+            y = top[top[y]]
+
+        return y
+
+
+class GroupContext:
+    __slots__ = ('generator', 'prime_field', 'exp_engine', 'threshold',
+                 '__weakref__')
+    _contexts = WeakValueDictionary()  # (g, p) -> context, while referenced
+    _recent = OrderedDict()  # recently shared contexts kept alive, LRU first
+
+    def __init__(self, generator: int, prime_field: int):
+        """
+        Immutable group parameters (g, p) together with everything derived
+        from them, shared by every primitive built on the group. Use
+        `GroupContext.shared` to get the one instance per (g, p).
+
+        Each assignment file is graded on its own and so carries its own
+        copy of the primitives, with its own registry: contexts are shared
+        within one loaded module, not between modules. To share the tables
+        across modules, pass one module's context as `context=` to the
+        primitives of the others.
+        :param generator: g
+        :type generator: int
+        :param prime_field: p
+        :type prime_field: int
+        """
+        exp_engine = FixedBaseExp.shared(generator, prime_field)
+
+        set_slot = object.__setattr__
+        set_slot(self, 'generator', generator)
+        set_slot(self, 'prime_field', prime_field)
+        set_slot(self, 'exp_engine', exp_engine)
+        # hardcore bit of y is 1 iff y >= (p - 1) / 2, i.e. y >= ⌈(p - 1) / 2⌉
+        set_slot(self, 'threshold', prime_field // 2)
+
+    @classmethod
+    def shared(cls, generator: int, prime_field: int) -> 'GroupContext':
+        """
+        Return the context for (g, p), building it on first use; kept alive
+        like the engines of `FixedBaseExp.shared`
+        :param generator: g
+        :type generator: int
+        :param prime_field: p
+        :type prime_field: int
+        """
+        key = (generator, prime_field)
+        context = cls._contexts.get(key)
+        if context is None:
+            context = cls(generator, prime_field)
+            cls._contexts[key] = context
+
+        cls._recent[key] = context
+        cls._recent.move_to_end(key)
+        if len(cls._recent) > _GROUP_CACHE_SIZE:
+            cls._recent.popitem(last=False)
+
+        return context
+
+    @classmethod
+    def resolve(cls, generator: int, prime_field: int,
+                context: Optional['GroupContext']) -> 'GroupContext':
+        """
+        The context a primitive on (g, p) should use: `context` if given,
+        otherwise the shared one
+        :param generator: g
+        :type generator: int
+        :param prime_field: p
+        :type prime_field: int
+        :param context: caller supplied context
+        :type context: GroupContext
+        """
+        if context is None:
+            return cls.shared(generator, prime_field)
+
+        if (context.generator, context.prime_field) != (generator, prime_field):
+            raise ValueError('GroupContext is for (g, p) = (%d, %d), not (%d, %d)'
+                             % (context.generator, context.prime_field,
+                                generator, prime_field))
+        return context
+
+    def __setattr__(self, name, value):
+        raise AttributeError('GroupContext is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('GroupContext is immutable')
+
+    def __reduce__(self):
+        return GroupContext.shared, (self.generator, self.prime_field)
+
+    def __repr__(self) -> str:
+        return 'GroupContext(g=%d, p=%d)' % (self.generator, self.prime_field)
+
+
+class PRGState:
+    __slots__ = ('y', 'offset')
+
+    def __init__(self, y: int, offset: int = 0):
+        """
+        Resumable position inside a PRG output stream
+        :param y: current PRG state g^x (mod p), the seed at offset 0
+        :type y: int
+        :param offset: number of output bits already produced
+        :type offset: int
+        """
+        self.y = y
+        self.offset = offset
+
+    def copy(self) -> 'PRGState':
+        """
+        Snapshot of the state that later stream progress does not touch
+        """
+        return PRGState(self.y, self.offset)
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, PRGState) and self.y == other.y
+                and self.offset == other.offset)
+
+    def __repr__(self) -> str:
+        return 'PRGState(y=%d, offset=%d)' % (self.y, self.offset)
+
+
 class PRG:
+    _orbits = OrderedDict()  # (seed, g, p) -> orbit, oldest first
+
     def __init__(self, security_parameter: int, generator: int,
-                 prime_field: int, expansion_factor: int):
+                 prime_field: int, expansion_factor: int,
+                 context: Optional[GroupContext] = None):
         """
         Initialize values here
         :param security_parameter: n (from 1ⁿ)
@@ -11,11 +741,125 @@ class PRG:
         :type prime_field: int
         :param expansion_factor: l(n)
         :type expansion_factor: int
+        :param context: shared group context for (g, p)
+        :type context: GroupContext
         """
         self.security_parameter = security_parameter
         self.generator = generator
         self.prime_field = prime_field
         self.expansion_factor = expansion_factor
+        self.context = GroupContext.resolve(generator, prime_field, context)
+        self.exp_engine = self.context.exp_engine
+
+    def _advance(self, y: int, num_bits: int) -> tuple[int, int]:
+        """
+        Produce `num_bits` hardcore bits starting from state y
+        :param y: current state g^x (mod p)
+        :type y: int
+        :param num_bits: number of bits to produce
+        :type num_bits: int
+        :return: bits packed most significant first, next state
+        """
+        output = 0
+        threshold = self.context.threshold
+
+        for i in range(num_bits):
+
+            curr_seed = y
+
+            # hardcore bit: 0 if y < (p - 1) / 2 else 1
+            output = (output << 1) | (y >= threshold)
+
+            y = self.exp_engine.pow(curr_seed)
+
+        return output, y
+
+    def orbit(self, seed: int) -> tuple[int, int, int]:
+        """
+        Tail and cycle of the state sequence y -> g^y (mod p) from seed,
+        found once with Brent's algorithm and cached per (seed, g, p)
+        :param seed: uniformly sampled seed
+        :type seed: int
+        :return: tail length μ, cycle length λ, and the μ + λ output bits
+            of the tail followed by one period, most significant first
+        """
+        key = (seed, self.generator, self.prime_field)
+        cached = PRG._orbits.get(key)
+        if _op_counts is not None:
+            if cached is not None:
+                _op_counts.cache_hits += 1
+            else:
+                _op_counts.cache_misses += 1
+        if cached is not None:
+            return cached
+
+        tail_length, cycle_length = _brent(self.exp_engine.pow, seed)
+        bits = self._advance(seed, tail_length + cycle_length)[0]
+
+        if len(PRG._orbits) >= _ORBIT_CACHE_SIZE:
+            PRG._orbits.popitem(last=False)
+        PRG._orbits[key] = (tail_length, cycle_length, bits)
+
+        return tail_length, cycle_length, bits
+
+    def _periodic(self, seed: int) -> int:
+        """
+        generate_int for outputs longer than the orbit, by repeating the
+        cached period instead of exponentiating
+        :param seed: uniformly sampled seed
+        :type seed: int
+        """
+        tail_length, cycle_length, bits = self.orbit(seed)
+        total = tail_length + cycle_length
+
+        if self.expansion_factor <= total:
+            return bits >> (total - self.expansion_factor)
+
+        period = bits & ((1 << cycle_length) - 1)
+        repeats, remainder = divmod(self.expansion_factor - tail_length,
+                                    cycle_length)
+
+        # concatenate `repeats` periods by doubling
+        output = bits >> cycle_length
+        block, block_length = period, cycle_length
+        while repeats:
+            if repeats & 1:
+                output = (output << block_length) | block
+            block = (block << block_length) | block
+            block_length *= 2
+            repeats >>= 1
+
+        return (output << remainder) | (period >> (cycle_length - remainder))
+
+    def generate_int(self, seed: int) -> int:
+        """
+        Generate the pseudo-random bits from seed packed into an integer,
+        the first output bit being the most significant
+        :param seed: uniformly sampled seed
+        :type seed: int
+        """
+        if _op_counts is not None:
+            _op_counts.prg_calls += 1
+
+        # every orbit has at most p + 1 distinct states, so longer outputs
+        # are guaranteed to repeat
+        if self.expansion_factor > self.prime_field:
+            return self._periodic(seed)
+
+        return self._advance(seed, self.expansion_factor)[0]
+
+    def generate_bytes(self, seed: int) -> bytes:
+        """
+        Generate the pseudo-random bits from seed as bytes, most significant
+        bit first; the last byte is padded with zero bits when l(n) is not a
+        multiple of 8
+        :param seed: uniformly sampled seed
+        :type seed: int
+        """
+        pad = -self.expansion_factor % 8
+
+        return (self.generate_int(seed) << pad).to_bytes(
+            (self.expansion_factor + pad) // 8, 'big')
 
     def generate(self, seed: int) -> str:
         """
@@ -23,26 +867,262 @@ class PRG:
         :param seed: uniformly sampled seed
         :type seed: int
         """
-        output_string = ''
-        y = seed  # y = g^x (mod p)
+        if self.expansion_factor <= 0:
+            return ''
 
-        for i in range(self.expansion_factor):
+        return format(self.generate_int(seed), '0%db' % self.expansion_factor)
 
-            curr_seed = y
+    def stream(self, seed: int, chunk_size: int = 0,
+               state: Optional[PRGState] = None) -> Iterator:
+        """
+        Lazily yield the output of `generate(seed)`, as single bits (0/1)
+        when chunk_size is 0, otherwise as bytes chunks of chunk_size bytes
+        packed like `generate_bytes`. Progress is written to `state` before
+        every yield, so a copy of it resumes the stream where it stopped.
+        :param seed: uniformly sampled seed, ignored when resuming
+        :type seed: int
+        :param chunk_size: bytes per chunk, 0 for single bits
+        :type chunk_size: int
+        :param state: position to resume from and record progress in
+        :type state: PRGState
+        """
+        if state is None:
+            state = PRGState(seed)
 
-            if(y < (self.prime_field - 1) / 2):
-                output_string += '0'
-            else:
-                output_string += '1'
+        if _op_counts is not None:
+            _op_counts.prg_calls += 1
+
+        if chunk_size <= 0:
+            while state.offset < self.expansion_factor:
+                bit, state.y = self._advance(state.y, 1)
+                state.offset += 1
+                yield bit
+            return
+
+        while state.offset < self.expansion_factor:
+            num_bits = min(8 * chunk_size, self.expansion_factor - state.offset)
+            chunk, state.y = self._advance(state.y, num_bits)
+            state.offset += num_bits
+
+            pad = -num_bits % 8
+            yield (chunk << pad).to_bytes((num_bits + pad) // 8, 'big')
+
+    def generate_many(self, seeds):
+        """
+        Generate the output of `generate` for many seeds at once as a 2-D bit
+        matrix, row i holding the bits for seeds[i]. For p < 2^32 the states
+        of all seeds advance together in NumPy uint64 lanes; otherwise (or
+        without NumPy) every row is generated with Python ints.
+        :param seeds: uniformly sampled seeds, or a NumPy uint64 array of them
+        :type seeds: Iterable[int]
+        :return: uint8 array of shape (len(seeds), l(n)), or a list of bit
+            lists when NumPy is not installed
+        """
+        length = self.expansion_factor
+
+        if (np is None or self.exp_engine.order is None
+                or self.prime_field >= _LANE_LIMIT):
+            seeds = [int(seed) for seed in seeds]
+            rows = [[(packed >> (length - 1 - j)) & 1 for j in range(length)]
+                    for packed in map(self.generate_int, seeds)]
+            if np is None:
+                return rows
+            return np.array(rows, dtype=np.uint8).reshape(len(seeds), length)
 
-            y = (self.generator ** curr_seed) % self.prime_field
+        if not isinstance(seeds, np.ndarray):
+            seeds = list(seeds)
 
-        return output_string
+        if _op_counts is not None:
+            _op_counts.prg_calls += len(seeds)
+
+        output = np.empty((len(seeds), length), dtype=np.uint8)
+        if not len(seeds) or length <= 0:
+            return output
+
+        order = np.uint64(self.exp_engine.order)
+        threshold = np.uint64(self.context.threshold)
+
+        if isinstance(seeds, np.ndarray):
+            seeds = seeds.astype(np.uint64, copy=False)
+            output[:, 0] = seeds >= threshold
+            y = seeds % order
+        else:
+            # seeds may lie outside Z_p and beyond 64 bits, so the first bit
+            # and exponent reduction are done on Python ints
+            output[:, 0] = [seed >= self.context.threshold for seed in seeds]
+            y = np.array([seed % self.exp_engine.order for seed in seeds],
+                         dtype=np.uint64)
+
+        for j in range(1, length):
+            y = self.exp_engine.pow_lanes(y)
+            output[:, j] = y >= threshold
+            y %= order
+
+        return output
+
+    def bit_at(self, seed: int, index: int) -> int:
+        """
+        The bit `generate(seed)[index]` without producing the bits before it
+        :param seed: uniformly sampled seed
+        :type seed: int
+        :param index: bit position i, 0 <= i < l(n)
+        :type index: int
+        """
+        if not 0 <= index < self.expansion_factor:
+            raise IndexError('PRG bit index out of range')
+
+        if _op_counts is not None:
+            _op_counts.prg_calls += 1
+
+        y = self.exp_engine.iterate(seed, index)
+
+        return int(y >= self.context.threshold)
+
+    def generate_range(self, seed: int, start: int, stop: int) -> str:
+        """
+        The bit-string `generate(seed)[start:stop]`, seeking to `start`
+        through the jump tables instead of producing the bits before it
+        :param seed: uniformly sampled seed
+        :type seed: int
+        :param start: first bit position
+        :type start: int
+        :param stop: bit position after the last one
+        :type stop: int
+        """
+        start, stop = slice(start, stop).indices(self.expansion_factor)[:2]
+        if stop <= start:
+            return ''
+
+        if _op_counts is not None:
+            _op_counts.prg_calls += 1
+
+        y = self.exp_engine.iterate(seed, start)
+        output = self._advance(y, stop - start)[0]
+
+        return format(output, '0%db' % (stop - start))
+
+
+_PRF_NODE_CACHE = 4  # GGM nodes per tree level cached by the PRF of CPA
+_PRF_TASKS_PER_WORKER = 4  # subtree chunks per worker process, for balance
+_PRF_PARALLEL_MIN_BATCH = 256  # smaller batches stay in-process
+_PRF_EXPAND_SLICE = 1 << 14  # GGM nodes expanded per vectorized PRG step
+_PRF_EXECUTORS = 2  # worker pools kept alive between calls, see PRF.executor
+_PRF_TABLE_MAGIC = b'GGMPRF01'
+_PRF_TABLE_HEADER = struct.Struct('<8sII32s')  # magic, n, entry bytes, digest
+_PRF_TABLE_LIMIT = 24  # largest n whose table evaluate_all builds in memory
+
+_worker_prf = None  # PRF of a pool worker process, set by _init_prf_worker
+
+
+def _init_prf_worker(security_parameter: int, generator: int,
+                     prime_field: int, key: int, context: 'GroupContext'):
+    """
+    Process-pool initializer: build the worker's PRF once, so the group
+    context and key travel to each worker a single time
+    """
+    global _worker_prf
+    _worker_prf = PRF(security_parameter, generator, prime_field, key, context)
+
+
+def _evaluate_prf_subtree(xs: list[int], counting: bool = False) -> tuple:
+    """
+    Process-pool task: evaluate one contiguous prefix region of the tree,
+    along with the operations it took when the caller is counting them
+    """
+    if not counting:
+        return _worker_prf.evaluate_many(xs), None
+
+    with count_operations() as counts:
+        outputs = _worker_prf.evaluate_many(xs)
+    return outputs, counts.as_dict()
+
+
+def _pool_context():
+    """
+    multiprocessing context for PRF worker pools: the platform default,
+    except that a process with other threads running (a PadPool worker, a
+    keystream prefetch) is never forked, since the child would inherit
+    the locks those threads may hold; it spawns its workers instead
+    """
+    context = multiprocessing.get_context()
+    if context.get_start_method() == 'fork' and threading.active_count() > 1:
+        context = multiprocessing.get_context('spawn')
+    return context
+
+
+def _workers_can_import(start_method: str) -> bool:
+    """
+    Whether pool tasks can reach this module. They are pickled by module
+    name, so the module must be registered in sys.modules under its
+    __name__, as `import` does; a module loaded from a file path with
+    importlib must be added there by the loader. Forked workers inherit
+    it; spawned workers must also find it by name on sys.path.
+    :param start_method: start method of the worker pool
+    :type start_method: str
+    """
+    module = sys.modules.get(__name__)
+    task = getattr(module, '_evaluate_prf_subtree', None)
+    if task is not _evaluate_prf_subtree:
+        return False
+
+    if start_method == 'fork' or __name__ == '__main__' or '.' in __name__:
+        # the main script is re-run by spawned workers, and a package
+        # submodule is importable through its package
+        return True
+
+    spec = importlib.machinery.PathFinder.find_spec(__name__)
+    return (spec is not None and spec.origin is not None
+            and os.path.samefile(spec.origin, __file__))
+
+
+class GGMNodeCache:
+    def __init__(self, capacity: int):
+        """
+        Bounded LRU cache of intermediate GGM tree nodes, keyed by
+        (key, prefix, depth). `hits` counts evaluations that resumed from a
+        cached node, `misses` those that had to start from the root.
+        :param capacity: maximum number of cached nodes
+        :type capacity: int
+        """
+        self.capacity = capacity
+        self.nodes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, node: tuple) -> Optional[int]:
+        """
+        Seed of a cached node, marking it most recently used
+        :param node: (key, prefix, depth)
+        :type node: tuple
+        """
+        seed = self.nodes.get(node)
+        if seed is not None:
+            self.nodes.move_to_end(node)
+        return seed
+
+    def put(self, node: tuple, seed: int):
+        """
+        Cache the seed of a node, evicting the least recently used one
+        :param node: (key, prefix, depth)
+        :type node: tuple
+        :param seed: node value
+        :type seed: int
+        """
+        self.nodes[node] = seed
+        self.nodes.move_to_end(node)
+        if len(self.nodes) > self.capacity:
+            self.nodes.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
 
 
 class PRF:
+    _executors = OrderedDict()  # (n, g, p, k, processes, method) -> pool
+
     def __init__(self, security_parameter: int, generator: int,
-                 prime_field: int, key: int):
+                 prime_field: int, key: int,
+                 context: Optional[GroupContext] = None, cache_size: int = 0):
         """
         Initialize values here
         :param security_parameter: 1ⁿ
@@ -53,11 +1133,21 @@ class PRF:
         :type prime_field: int
         :param key: k, uniformly sampled key
         :type key: int
+        :param context: shared group context for (g, p)
+        :type context: GroupContext
+        :param cache_size: GGM nodes to keep in an LRU cache, 0 to disable
+        :type cache_size: int
         """
         self.security_parameter = security_parameter
         self.generator = generator
         self.prime_field = prime_field
         self.key = key
+        self.context = GroupContext.resolve(generator, prime_field, context)
+        self.PRG_instance = PRG(security_parameter, generator, prime_field,
+                                2 * security_parameter, self.context)
+        self.node_cache = GGMNodeCache(cache_size) if cache_size > 0 else None
+        self.lookup_table = None  # read-only mmap set by load_table
+        self.lookup_width = 0
 
     def evaluate(self, x: int) -> int:
         """
@@ -65,32 +1155,685 @@ class PRF:
         :param x: input for Fₖ
         :type x: int
         """
-        x_bin = bin(x)[2:].zfill(self.security_parameter)
+        n = self.security_parameter
+        mask = (1 << n) - 1
+
+        # inputs wider than n bits walk their leading n bits
+        x >>= max(x.bit_length() - n, 0)
+
+        if self.lookup_table is not None:
+            return self._lookup(x)
 
         PRG_seed = self.key
+        depth = 0
+
+        if self.node_cache is not None:
+            # resume from the deepest cached ancestor of x
+            for d in range(n, 0, -1):
+                seed = self.node_cache.get((self.key, x >> (n - d), d))
+                if seed is not None:
+                    PRG_seed, depth = seed, d
+                    break
 
-        PRG_instance = PRG(self.security_parameter, self.generator,
-                           self.prime_field, 2 * (self.security_parameter))
+            if depth:
+                self.node_cache.hits += 1
+            else:
+                self.node_cache.misses += 1
 
-        for i in range(self.security_parameter):
-            PRG_output = PRG_instance.generate(PRG_seed)
+            if _op_counts is not None:
+                if depth:
+                    _op_counts.cache_hits += 1
+                else:
+                    _op_counts.cache_misses += 1
 
-            PRG_output_bin_1 = PRG_output[0: self.security_parameter]
-            PRG_output_bin_2 = PRG_output[self.security_parameter:]
+        if _op_counts is not None:
+            _op_counts.ggm_levels += n - depth
 
-            if(x_bin[i] == '0'):
-                output = PRG_output_bin_1
+        for i in range(n - depth - 1, -1, -1):
+            PRG_output = self.PRG_instance.generate_int(PRG_seed)
+
+            # left child: first n bits of G(s), right child: last n bits
+            if (x >> i) & 1:
+                PRG_seed = PRG_output & mask
             else:
-                output = PRG_output_bin_2
+                PRG_seed = PRG_output >> n
 
-            PRG_seed = int(output, 2)
+            if self.node_cache is not None:
+                self.node_cache.put((self.key, x >> i, n - i), PRG_seed)
 
         return PRG_seed
 
+    def evaluate_many(self, xs, processes: Optional[int] = 1) -> list[int]:
+        """
+        Evaluate the pseudo-random function at every input of `xs` with one
+        depth-first pass over the GGM tree: inputs are visited in sorted
+        order and every internal node on their paths is expanded once.
+        With several processes the sorted inputs are cut into contiguous
+        prefix regions of the tree, each walked by a pool worker (see
+        `executor`); when workers cannot load this module (see
+        _workers_can_import) a RuntimeWarning is issued and the walk stays
+        serial.
+        :param xs: inputs for Fₖ
+        :type xs: Iterable[int]
+        :param processes: worker processes, None for one per CPU
+        :type processes: int
+        :return: Fₖ(x) for each x, in the order of `xs`
+        """
+        n = self.security_parameter
+        mask = (1 << n) - 1
+
+        # inputs wider than n bits walk their leading n bits
+        xs = [x >> max(x.bit_length() - n, 0) for x in xs]
+        if n <= 0:
+            return [self.key] * len(xs)
+
+        if self.lookup_table is not None:
+            return [self._lookup(x) for x in xs]
+
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if processes > 1 and len(xs) >= _PRF_PARALLEL_MIN_BATCH:
+            mp_context = _pool_context()
+            if _workers_can_import(mp_context.get_start_method()):
+                return self._evaluate_parallel(xs, processes, mp_context)
+            warnings.warn('%s cannot be loaded by %s worker processes; '
+                          'evaluating serially'
+                          % (__name__, mp_context.get_start_method()),
+                          RuntimeWarning, stacklevel=2)
+
+        # outputs[d] = G(s) for the node s at depth d on the current path
+        outputs = [0] * n
+        results = {}
+        prev = None
+
+        for x in sorted(set(xs)):
+            if prev is None:
+                outputs[0] = self.PRG_instance.generate_int(self.key)
+                shared = 0
+            else:
+                # x and prev share the nodes at depths 0..shared
+                shared = n - (x ^ prev).bit_length()
+
+            if _op_counts is not None:
+                _op_counts.ggm_levels += n - shared
+
+            for d in range(shared, n):
+                if d > shared:
+                    outputs[d] = self.PRG_instance.generate_int(PRG_seed)
+
+                if (x >> (n - 1 - d)) & 1:
+                    PRG_seed = outputs[d] & mask
+                else:
+                    PRG_seed = outputs[d] >> n
+
+            results[x] = PRG_seed
+            prev = x
+
+        return [results[x] for x in xs]
+
+    def _evaluate_parallel(self, xs: list[int], processes: int,
+                           mp_context) -> list[int]:
+        """
+        evaluate_many over a process pool; `xs` are already n-bit inputs
+        :param xs: inputs for Fₖ
+        :type xs: list[int]
+        :param processes: worker processes
+        :type processes: int
+        :param mp_context: multiprocessing context of the pool
+        :type mp_context: multiprocessing.context.BaseContext
+        """
+        inputs = sorted(set(xs))
+        num_tasks = min(len(inputs), processes * _PRF_TASKS_PER_WORKER)
+
+        # contiguous runs of sorted inputs are unions of adjacent subtrees
+        bounds = [len(inputs) * i // num_tasks for i in range(num_tasks + 1)]
+        tasks = [inputs[bounds[i]: bounds[i + 1]] for i in range(num_tasks)]
+
+        results = {}
+        pool = self.executor(processes, mp_context)
+        counting = [_op_counts is not None] * len(tasks)
+        for task, (outputs, counts) in zip(
+                tasks, pool.map(_evaluate_prf_subtree, tasks, counting)):
+            results.update(zip(task, outputs))
+            if counts is not None and _op_counts is not None:
+                _op_counts.add(counts)
+
+        return [results[x] for x in xs]
+
+    def executor(self, processes: int,
+                 mp_context=None) -> ProcessPoolExecutor:
+        """
+        Worker pool for this key, created on first use and kept for later
+        calls (also by other PRF instances with the same key and group, such
+        as the fresh PRF of every MAC.mac); the least recently used pool is
+        shut down beyond _PRF_EXECUTORS
+        :param processes: worker processes
+        :type processes: int
+        :param mp_context: multiprocessing context, see _pool_context
+        :type mp_context: multiprocessing.context.BaseContext
+        """
+        if mp_context is None:
+            mp_context = _pool_context()
+
+        # a fork pool is not reused once threads are running: its workers
+        # are forked lazily, on submit
+        pool_key = (self.security_parameter, self.generator,
+                    self.prime_field, self.key, processes,
+                    mp_context.get_start_method())
+        pool = PRF._executors.get(pool_key)
+
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=processes, mp_context=mp_context,
+                initializer=_init_prf_worker,
+                initargs=(self.security_parameter, self.generator,
+                          self.prime_field, self.key, self.context))
+            PRF._executors[pool_key] = pool
+            if len(PRF._executors) > _PRF_EXECUTORS:
+                PRF._executors.popitem(last=False)[1].shutdown(wait=False)
+        else:
+            PRF._executors.move_to_end(pool_key)
+
+        return pool
+
+    def _expand_level(self, level):
+        """
+        Expand every node of one GGM tree level with vectorized PRG steps
+        over slices of _PRF_EXPAND_SLICE nodes, so the PRG bit matrix stays
+        bounded whatever the level size (Python ints without NumPy or for
+        n > 64)
+        :param level: node seeds
+        :type level: np.ndarray | list[int]
+        :return: children, left and right child of each node in turn
+        """
+        n = self.security_parameter
+
+        if np is None or n > 64:
+            mask = (1 << n) - 1
+            children = []
+            for seed in level:
+                output = self.PRG_instance.generate_int(seed)
+                children += (output >> n, output & mask)
+            return children
+
+        # G(s) bits packed MSB first into ⌈2n / 8⌉ bytes, then read as the
+        # big-endian 2n-bit value of each node: left half above right half
+        width = (2 * n + 7) // 8
+        children = np.empty(2 * len(level), dtype=np.uint64)
+        mask = np.uint64((1 << n) - 1)
+
+        for start in range(0, len(level), _PRF_EXPAND_SLICE):
+            bits = self.PRG_instance.generate_many(
+                level[start: start + _PRF_EXPAND_SLICE])
+            rows = np.zeros((len(bits), 16), dtype=np.uint8)
+            rows[:, 16 - width:] = np.packbits(bits, axis=1)
+            words = rows.view('>u8').astype(np.uint64)
+            del bits, rows
+
+            # words[:, 0]:words[:, 1] hold G(s) << (8 * width - 2n)
+            pad = np.uint64(8 * width - 2 * n)
+            high, low = words[:, 0], words[:, 1]
+            if pad:
+                low = (low >> pad) | (high << (np.uint64(64) - pad))
+                high = high >> pad
+
+            # left child: bits 2n-1..n, right child: bits n-1..0
+            if n == 64:
+                left, right = high, low
+            else:
+                left = (high << np.uint64(64 - n)) | (low >> np.uint64(n))
+                right = low & mask
+            stop = start + len(words)
+            children[2 * start: 2 * stop: 2] = left
+            children[2 * start + 1: 2 * stop: 2] = right
+
+        return children
+
+    def evaluate_range(self, lo: int, hi: int):
+        """
+        Evaluate the pseudo-random function at every input lo <= x < hi by
+        expanding the GGM tree breadth-first, one vectorized PRG step per
+        level, restricted to the nodes above the range
+        :param lo: first input
+        :type lo: int
+        :param hi: input after the last one
+        :type hi: int
+        :return: Fₖ(lo), ..., Fₖ(hi - 1) as a NumPy uint64 array, an
+            array('Q') without NumPy, or a list of ints for n > 64
+        """
+        n = self.security_parameter
+        lo, hi = max(lo, 0), min(hi, 1 << n)
+
+        level = [self.key] if hi > lo else []
+        first = 0  # prefix of level[0]
+
+        for d in range(n):
+            if not len(level):
+                break
+
+            if _op_counts is not None:
+                _op_counts.ggm_levels += len(level)
+
+            children = self._expand_level(level)
+
+            # keep the children whose subtrees meet [lo, hi)
+            shift = n - d - 1
+            level = children[(lo >> shift) - 2 * first:
+                             ((hi - 1) >> shift) + 1 - 2 * first]
+            first = lo >> shift
+
+        if n > 64:
+            return list(level)
+        if np is not None:
+            return np.asarray(level, dtype=np.uint64)
+        return array('Q', level)
+
+    def evaluate_all(self):
+        """
+        Tabulate the pseudo-random function over its whole domain
+        0 <= x < 2ⁿ, see `evaluate_range`
+        """
+        return self.evaluate_range(0, 1 << self.security_parameter)
+
+    def _table_digest(self) -> bytes:
+        """
+        Digest binding a persisted table to (n, g, p, k)
+        """
+        return hashlib.sha256(repr((self.security_parameter, self.generator,
+                                    self.prime_field, self.key)).encode()
+                              ).digest()
+
+    def save_table(self, path: str):
+        """
+        Tabulate Fₖ over its whole domain and write it to `path` as a
+        header followed by 2ⁿ little-endian entries of ⌈n / 8⌉ bytes, for
+        `load_table` to serve from a shared read-only mapping
+        :param path: output file
+        :type path: str
+        """
+        n = self.security_parameter
+        if not 0 < n <= _PRF_TABLE_LIMIT:
+            raise ValueError('PRF tables are only kept for 0 < n <= %d'
+                             % _PRF_TABLE_LIMIT)
+
+        width = (n + 7) // 8
+        table = self.evaluate_all()
+
+        if np is not None:
+            data = (np.asarray(table, dtype='<u8').view(np.uint8)
+                    .reshape(-1, 8)[:, :width].tobytes())
+        else:
+            data = b''.join(value.to_bytes(width, 'little') for value in table)
+
+        with open(path, 'wb') as f:
+            f.write(_PRF_TABLE_HEADER.pack(_PRF_TABLE_MAGIC, n, width,
+                                           self._table_digest()))
+            f.write(data)
+
+    def load_table(self, path: str):
+        """
+        Map a table written by `save_table` read-only, so that `evaluate`
+        becomes a lookup; processes mapping the same file share its pages
+        :param path: table file
+        :type path: str
+        """
+        error = ValueError('%s is not a PRF table for this key' % path)
+
+        with open(path, 'rb') as f:
+            header = f.read(_PRF_TABLE_HEADER.size)
+            if len(header) != _PRF_TABLE_HEADER.size:
+                raise error
+
+            # the header is checked before its n and width size anything
+            magic, n, width, digest = _PRF_TABLE_HEADER.unpack(header)
+            if (magic != _PRF_TABLE_MAGIC or n != self.security_parameter
+                    or width != (n + 7) // 8
+                    or digest != self._table_digest()):
+                raise error
+
+            expected = _PRF_TABLE_HEADER.size + (width << n)
+            if os.fstat(f.fileno()).st_size != expected:
+                raise error
+
+            table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.lookup_table = table
+        self.lookup_width = width
+
+    def _lookup(self, x: int) -> int:
+        """
+        Fₖ(x) read from the mapped table; x is an n-bit input
+        :param x: input for Fₖ
+        :type x: int
+        """
+        offset = _PRF_TABLE_HEADER.size + x * self.lookup_width
+
+        return int.from_bytes(
+            self.lookup_table[offset: offset + self.lookup_width], 'little')
+
+
+_CPA_MODES = ('CTR', 'OFB', 'CBC')
+_CPA_FEISTEL_ROUNDS = 3  # Luby-Rackoff: 3 rounds of a PRF give a PRP
+_CPA_PAD_QUEUE = 8  # pads the background worker keeps ready
+_CPA_PAD_REQUESTS = 1024  # unscheduled seeds a PadPool remembers
+
+
+class PadPool:
+    def __init__(self, cpa: 'CPA', seeds: Iterable[int], num_blocks: int,
+                 depth: int = _CPA_PAD_QUEUE):
+        """
+        Background worker computing the pads of upcoming random seeds into a
+        bounded queue, so that `CPA.enc` only XORs. `hits` counts
+        encryptions served from the queue, `misses` those that found no
+        ready pad for their seed and computed it themselves.
+        :param cpa: scheme whose pads are computed
+        :type cpa: CPA
+        :param seeds: upcoming distinct random seeds, in the order enc will
+            use them
+        :type seeds: Iterable[int]
+        :param num_blocks: blocks per pad
+        :type num_blocks: int
+        :param depth: pads kept ready
+        :type depth: int
+        """
+        self.num_blocks = num_blocks
+        self.depth = depth
+        self.ready = OrderedDict()  # seed -> (position in seeds, pads)
+        self.computing = None  # (seed, position) the worker is on
+        self.consumed = -1  # last position enc has moved past
+        self.requested = OrderedDict()  # seeds enc asked for before they
+        # were scheduled, skipped when the worker reaches them
+        self.condition = threading.Condition()
+        self.hits = 0
+        self.misses = 0
+        self.stop = threading.Event()
+
+        # the worker gets its own PRF: its GGM node cache is not thread-safe
+        worker = type(cpa)(cpa.security_parameter, cpa.prime_field,
+                           cpa.generator, cpa.key, cpa.mode, cpa.context)
+        self.thread = threading.Thread(
+            target=self._produce, args=(worker, iter(seeds)), daemon=True)
+        self.thread.start()
+
+        # a CPA dropped without close() must not leave the worker waiting
+        # forever for an enc that never comes
+        self.finalizer = finalize(cpa, self.close)
+
+    def _produce(self, worker: 'CPA', seeds: Iterable[int]):
+        for position, random_seed in enumerate(seeds):
+            with self.condition:
+                if self.stop.is_set():
+                    return
+                if self.requested.pop(random_seed, None) is not None:
+                    # enc already computed this pad, and the ones before it
+                    # are behind the sender
+                    self._consume(position)
+                    continue
+                self.computing = (random_seed, position)
+
+            pads = worker._pads(random_seed, self.num_blocks, 1)
+
+            with self.condition:
+                self.computing = None
+                while (len(self.ready) >= self.depth
+                       and position > self.consumed
+                       and not self.stop.is_set()):
+                    self.condition.wait(0.1)
+                if self.stop.is_set():
+                    return
+                if position > self.consumed:
+                    self.ready[random_seed] = (position, pads)
+
+    def _consume(self, position: int):
+        """
+        Mark the seeds scheduled up to `position` as used and drop their
+        queued pads; the caller holds `condition`
+        """
+        self.consumed = max(self.consumed, position)
+        while self.ready:
+            seed, (queued, pads) = next(iter(self.ready.items()))
+            if queued > self.consumed:
+                break
+            del self.ready[seed]
+        self.condition.notify_all()
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Pads ready in the queue
+        """
+        return len(self.ready)
+
+    def take(self, random_seed: int, num_blocks: int) -> Optional[list[int]]:
+        """
+        Ready pads of `random_seed`, or None on a miss. Hit or miss, the
+        pads of the seeds scheduled up to this one are dropped (a pad is
+        never used twice) and the worker skips them; a seed that is not
+        in `seeds` leaves the queue untouched.
+        :param random_seed: ctr for CTR, IV for OFB
+        :type random_seed: int
+        :param num_blocks: blocks needed
+        :type num_blocks: int
+        """
+        with self.condition:
+            entry = self.ready.get(random_seed)
+            if entry is not None:
+                self._consume(entry[0])
+            elif self.computing is not None and self.computing[0] == random_seed:
+                self._consume(self.computing[1])
+            else:
+                # not scheduled yet (or never): remember it for the worker
+                self.requested[random_seed] = True
+                if len(self.requested) > _CPA_PAD_REQUESTS:
+                    self.requested.popitem(last=False)
+
+        if entry is None or len(entry[1]) < num_blocks:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry[1]
+
+    @property
+    def closed(self) -> bool:
+        """
+        Whether `close` was called
+        """
+        return self.stop.is_set()
+
+    def close(self):
+        """
+        Stop the worker once its current pad is done; `CPA.enc` stops
+        consulting a closed pool. Called by itself when the CPA that
+        started the pool is garbage collected.
+        """
+        self.stop.set()
+        self.finalizer.detach()
+        with self.condition:
+            self.condition.notify()
+
+    def __enter__(self) -> 'PadPool':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self) -> str:
+        return 'PadPool(queue_depth=%d, hits=%d, misses=%d)' % (
+            self.queue_depth, self.hits, self.misses)
+
+
+class PlaintextView:
+    def __init__(self, cpa: 'CPA', cipher):
+        """
+        Read-only view of the plaintext of `cipher` that decrypts only the
+        blocks covering the bits accessed, e.g. view[i] or view[a:b].
+        Nothing is cached; every access decrypts again.
+        :param cpa: scheme that produced the ciphertext
+        :type cpa: CPA
+        :param cipher: ciphertext c
+        :type cipher: str | PackedBits
+        """
+        cipher = _adopt_bits(cipher)
+        self.cpa = cpa
+        self.cipher = cipher
+        self.num_blocks = max(
+            int((len(cipher) / cpa.security_parameter) - 1), 0)
+
+    def __len__(self) -> int:
+        return self.num_blocks * self.cpa.security_parameter
+
+    def block(self, index: int) -> str:
+        """
+        Plaintext block `index` (counted from 0)
+        :param index: block index
+        :type index: int
+        """
+        return self.cpa.dec_range(self.cipher, index, index)
+
+    def __getitem__(self, index) -> str:
+        n = self.cpa.security_parameter
+
+        if isinstance(index, slice):
+            positions = range(*index.indices(len(self)))
+            if not positions:
+                return ''
+
+            lo, hi = min(positions), max(positions)
+            offset = lo // n * n
+            text = str(self.cpa.dec_range(self.cipher, lo // n, hi // n))
+            if positions.step == 1:
+                return text[lo - offset: hi + 1 - offset]
+            return ''.join(text[i - offset] for i in positions)
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('plaintext index out of range')
+
+        return str(self.block(index // n))[index % n]
+
+    def __str__(self) -> str:
+        return self[:]
+
+
+class CPAStream:
+    def __init__(self, cpa: 'CPA', random_seed: Optional[int] = None,
+                 processes: Optional[int] = 1):
+        """
+        Incremental encryption (given a random seed) or decryption (seed
+        read from the ciphertext header) of bit strings arriving in chunks.
+        The block counter, chaining value and partial block are carried
+        between `update` calls, so the output of all updates and `finalize`
+        equals `CPA.enc` / `CPA.dec` of the whole message. As there, a
+        trailing partial block is dropped. Use `CPA.encryptor` and
+        `CPA.decryptor` to create one.
+        :param cpa: scheme to run
+        :type cpa: CPA
+        :param random_seed: ctr (IV for OFB and CBC), None to decrypt
+        :type random_seed: int
+        :param processes: worker processes computing CTR pads, see
+            PRF.evaluate_many
+        :type processes: int
+        """
+        self.cpa = cpa
+        self.decrypting = random_seed is None
+        self.random_seed = random_seed
+        self.processes = processes
+        self.state = random_seed  # OFB: y_(i - 1), CBC: c_(i - 1)
+        self.block_index = 0  # blocks processed so far
+        self.partial = PackedBits(0, 0)  # bits of the next, incomplete block
+        self.packed = False  # whether the last update was given PackedBits
+        self.header_done = False
+        self.finalized = False
+
+    def _process(self, blocks: list[int]) -> list[int]:
+        n = self.cpa.security_parameter
+        output = []
+
+        if self.cpa.mode == 'CBC':
+            for block in blocks:
+                if self.decrypting:
+                    output.append(xor_kernel(
+                        self.cpa._feistel(block, inverse=True), self.state, n))
+                    self.state = block
+                else:
+                    self.state = self.cpa._feistel(
+                        xor_kernel(block, self.state, n))
+                    output.append(self.state)
+        else:
+            if self.cpa.mode == 'CTR':
+                pads = self.cpa._pads(
+                    self.random_seed, self.block_index + len(blocks),
+                    self.processes, self.block_index)
+            else:
+                pads = []
+                for i in range(len(blocks)):
+                    self.state = self.cpa.prf.evaluate(self.state)
+                    pads.append(self.state)
+
+            for pad, block in zip(pads, blocks):
+                output.append(xor_kernel(pad, block, n))
+
+        self.block_index += len(blocks)
+        return output
+
+    def update(self, chunk):
+        """
+        Feed the next bits and return the output of the blocks completed,
+        as PackedBits when the chunk is PackedBits
+        :param chunk: next bits of the message (or ciphertext)
+        :type chunk: str | PackedBits
+        """
+        if self.finalized:
+            raise ValueError('update after finalize')
+
+        chunk = _adopt_bits(chunk)
+        self.packed = isinstance(chunk, PackedBits)
+        if not self.packed:
+            chunk = PackedBits.from_str(chunk)
+
+        n = self.cpa.security_parameter
+        data = self.partial + chunk
+        output = PackedBits(0, 0)
+
+        if not self.header_done:
+            if self.decrypting:
+                if len(data) < n:
+                    self.partial = data
+                    return output if self.packed else ''
+                self.random_seed = self.state = data[0: n].value
+                data = data[n:]
+            else:
+                output = PackedBits(self.random_seed,
+                                    max(n, self.random_seed.bit_length()))
+            self.header_done = True
+
+        blocks = data.blocks(n)
+        self.partial = data[len(blocks) * n:]
+
+        output = output + PackedBits.from_blocks(self._process(blocks), n)
+
+        return output if self.packed else output.to_str()
+
+    def finalize(self):
+        """
+        End the message and return any output still pending, of the type
+        the last `update` returned
+        """
+        output = PackedBits(0, 0) if self.packed else ''
+        if not self.decrypting:
+            output = self.update(output)
+
+        self.partial = PackedBits(0, 0)
+        self.finalized = True
+        return output
+
 
 class CPA:
     def __init__(self, security_parameter: int, prime_field: int,
-                 generator: int, key: int, mode="CTR"):
+                 generator: int, key: int, mode="CTR",
+                 context: Optional[GroupContext] = None):
         """
         Initialize the values here
         :param security_parameter: 1ⁿ
@@ -106,71 +1849,258 @@ class CPA:
             - OFB
             - CBC
         :type mode: str
+        :param context: shared group context for (g, p)
+        :type context: GroupContext
         """
+        if mode not in _CPA_MODES:
+            raise ValueError('unknown mode %r, expected one of %s'
+                             % (mode, ', '.join(_CPA_MODES)))
+        if mode == 'CBC' and (security_parameter % 2
+                              or security_parameter < 4):
+            raise ValueError('CBC mode needs an even n >= 4 for the '
+                             'Feistel block cipher')
+
         self.security_parameter = security_parameter
         self.prime_field = prime_field
         self.generator = generator
         self.key = key
         self.mode = mode
+        self.context = GroupContext.resolve(generator, prime_field, context)
+        # the node cache serves the one-input evaluations of the OFB chain
+        # and the CBC Feistel rounds, whose inputs share the round index
+        # prefix (half the PRG expansions for CBC); CTR pads go through
+        # evaluate_many, which shares subtrees itself and skips the cache
+        self.prf = PRF(security_parameter, generator, prime_field, key,
+                       self.context, _PRF_NODE_CACHE * security_parameter)
+        self.precomputed = {}  # random seed -> pads, see precompute
+        self.pad_pool = None  # background pad worker, see prefetch_pads
 
-    def enc(self, message: str, random_seed: int) -> str:
+    def precompute(self, random_seed: int, num_blocks: int):
+        """
+        Compute the keystream for `random_seed` ahead of the message (CTR or
+        OFB), so that the next `enc` with this seed only XORs. The keystream
+        is used by exactly one encryption.
+        :param random_seed: ctr for CTR, IV for OFB
+        :type random_seed: int
+        :param num_blocks: number of n-bit blocks to cover
+        :type num_blocks: int
+        """
+        if self.mode == 'CBC':
+            raise ValueError('CBC pads depend on the message and cannot be '
+                             'precomputed')
+
+        self.precomputed[random_seed] = self._pads(random_seed, num_blocks, 1)
+
+    def prefetch_pads(self, seeds: Iterable[int], num_blocks: int,
+                      depth: int = _CPA_PAD_QUEUE) -> PadPool:
+        """
+        Start a background worker computing the pads of `seeds` (CTR or
+        OFB) ahead of the messages; `enc` takes them from its queue and
+        falls back to computing the pad itself on a miss. Replaces the
+        previous worker, if any.
+        :param seeds: upcoming random seeds, in the order enc will use them
+        :type seeds: Iterable[int]
+        :param num_blocks: number of n-bit blocks per message
+        :type num_blocks: int
+        :param depth: pads kept ready
+        :type depth: int
+        """
+        if self.mode == 'CBC':
+            raise ValueError('CBC pads depend on the message and cannot be '
+                             'precomputed')
+
+        if self.pad_pool is not None:
+            self.pad_pool.close()
+        self.pad_pool = PadPool(self, seeds, num_blocks, depth)
+        return self.pad_pool
+
+    def _pads(self, random_seed: int, num_blocks: int,
+              processes: Optional[int], first_block: int = 0) -> list[int]:
+        """
+        Keystream blocks first_block..num_blocks - 1 of the CTR or OFB mode
+        :param random_seed: ctr for CTR, IV for OFB
+        :type random_seed: int
+        :param num_blocks: number of blocks
+        :type num_blocks: int
+        :param processes: worker processes for CTR, see PRF.evaluate_many
+        :type processes: int
+        :param first_block: index of the first block returned
+        :type first_block: int
+        """
+        if self.mode == 'CTR':
+            return self.prf.evaluate_many(
+                range(random_seed + first_block + 1,
+                      random_seed + num_blocks + 1), processes)
+
+        # OFB: y_i = F_k(y_{i - 1}), y_0 = IV
+        pads = []
+        y = random_seed
+        for i in range(num_blocks):
+            y = self.prf.evaluate(y)
+            if i >= first_block:
+                pads.append(y)
+
+        return pads
+
+    def _feistel(self, block: int, inverse: bool = False) -> int:
+        """
+        n-bit block cipher P_k for CBC: a balanced Feistel network whose
+        round functions are F_k(round || half) truncated to n / 2 bits
+        :param block: n-bit block
+        :type block: int
+        :param inverse: compute P_k⁻¹ instead
+        :type inverse: bool
+        """
+        half = self.security_parameter // 2
+        mask = (1 << half) - 1
+        left, right = block >> half, block & mask
+
+        rounds = range(1, _CPA_FEISTEL_ROUNDS + 1)
+        if not inverse:
+            for i in rounds:
+                round_output = self.prf.evaluate((i << half) | right) & mask
+                left, right = right, left ^ round_output
+        else:
+            for i in reversed(rounds):
+                round_output = self.prf.evaluate((i << half) | left) & mask
+                left, right = right ^ round_output, left
+
+        return (left << half) | right
+
+    def enc(self, message, random_seed: int,
+            processes: Optional[int] = 1):
         """
         Encrypt message against Chosen Plaintext Attack using randomized ctr mode
+        (or the OFB / CBC mode chosen at construction). A PackedBits message
+        gives a PackedBits ciphertext.
         :param message: m
-        :type message: int
-        :param random_seed: ctr
+        :type message: str | PackedBits
+        :param random_seed: ctr (IV for OFB and CBC)
         :type random_seed: int
+        :param processes: worker processes computing the pads of counter
+            ranges (see PRF.evaluate_many), None for one per CPU
+        :type processes: int
         """
-        x = PRF(self.security_parameter, self.generator,
-                self.prime_field, self.key)
+        message = _adopt_bits(message)
+        n = self.security_parameter
+        packed = isinstance(message, PackedBits)
+        if not packed:
+            message = PackedBits.from_str(message)
 
-        cipher_text = ''
+        message_blocks = message.blocks(n)
+        num_blocks = len(message_blocks)
+        cipher_blocks = []
 
-        num_blocks = int(len(message) / self.security_parameter)
+        if self.mode == 'CBC':
+            # c_i = P_k(m_i ⊕ c_{i - 1}), c_0 = IV
+            previous = random_seed
+            for message_block in message_blocks:
+                previous = self._feistel(xor_kernel(message_block, previous, n))
+                cipher_blocks.append(previous)
+        else:
+            pads = self.precomputed.pop(random_seed, None)
+            if self.pad_pool is not None and self.pad_pool.closed:
+                self.pad_pool = None
+            if pads is None and self.pad_pool is not None:
+                pads = self.pad_pool.take(random_seed, num_blocks)
+            if pads is None or len(pads) < num_blocks:
+                pads = self._pads(random_seed, num_blocks, processes)
 
-        for i in range(1, num_blocks + 1):
-            key_decimal = x.evaluate(random_seed + i)
+            for key_decimal, message_block in zip(pads, message_blocks):
+                cipher_blocks.append(xor_kernel(key_decimal, message_block, n))
 
-            str_1 = bin(key_decimal)[2:].zfill(self.security_parameter)
-            str_2 = message[(i - 1) * (self.security_parameter): (i * (self.security_parameter))]
+        cipher_text = (PackedBits(random_seed, max(n, random_seed.bit_length()))
+                       + PackedBits.from_blocks(cipher_blocks, n))
 
-            for i in range(len(str_1)):
-                if(str_1[i] == str_2[i]):
-                    cipher_text += '0'
-                else:
-                    cipher_text += '1'
+        return cipher_text if packed else cipher_text.to_str()
 
-        cipher_text = bin(random_seed)[2:].zfill(
-            self.security_parameter) + cipher_text
+    def dec(self, cipher, processes: Optional[int] = 1):
+        """
+        Decrypt ciphertext to obtain plaintext message
+        :param cipher: ciphertext c
+        :type cipher: str | PackedBits
+        :param processes: worker processes computing the pads of counter
+            ranges (see PRF.evaluate_many), None for one per CPU
+        :type processes: int
+        """
+        num_blocks = int((len(cipher) / self.security_parameter) - 1)
 
-        return cipher_text
+        return self.dec_range(cipher, 0, num_blocks - 1, processes)
 
-    def dec(self, cipher: str) -> str:
+    def dec_range(self, cipher, first_block: int, last_block: int,
+                  processes: Optional[int] = 1):
         """
-        Decrypt ciphertext to obtain plaintext message
+        Decrypt only the message blocks first_block..last_block (inclusive,
+        counted from 0) of a ciphertext. CTR and CBC blocks decrypt
+        independently; OFB still walks the keystream chain up to last_block.
         :param cipher: ciphertext c
-        :type cipher: str
+        :type cipher: str | PackedBits
+        :param first_block: index of the first block
+        :type first_block: int
+        :param last_block: index of the last block
+        :type last_block: int
+        :param processes: worker processes computing the pads of counter
+            ranges (see PRF.evaluate_many), None for one per CPU
+        :type processes: int
         """
-        message = ''
+        cipher = _adopt_bits(cipher)
+        n = self.security_parameter
+        message_blocks = []
 
-        x = PRF(self.security_parameter, self.generator,
-                self.prime_field, self.key)
+        num_blocks = int((len(cipher) / n) - 1)
+        if first_block < 0 or last_block >= num_blocks:
+            raise IndexError('blocks %d..%d out of range for %d blocks'
+                             % (first_block, last_block, num_blocks))
 
-        num_blocks = int((len(cipher) / self.security_parameter) - 1)
+        packed = isinstance(cipher, PackedBits)
+        header = cipher[0: n]
+        random_seed = header.value if packed else int(header, 2)
 
-        random_seed = int(cipher[0: self.security_parameter], 2)
+        # c_first (the block before the range, for CBC) .. c_(last + 1)
+        span = cipher[first_block * n: (last_block + 2) * n]
+        if not packed:
+            span = PackedBits.from_str(span)
+        cipher_blocks = span.blocks(n)
 
-        for i in range(1, num_blocks + 1):
-            key_decimal = x.evaluate(random_seed + i)
+        if self.mode == 'CBC':
+            # m_i = P_k⁻¹(c_i) ⊕ c_{i - 1}
+            for previous, cipher_block in zip(cipher_blocks, cipher_blocks[1:]):
+                message_blocks.append(xor_kernel(
+                    self._feistel(cipher_block, inverse=True), previous, n))
+        else:
+            pads = self._pads(random_seed, last_block + 1, processes,
+                              first_block)
 
-            str_1 = bin(key_decimal)[2:].zfill(self.security_parameter)
-            str_2 = cipher[(i) * (self.security_parameter): (((i + 1)) * (self.security_parameter))]
+            for key_decimal, cipher_block in zip(pads, cipher_blocks[1:]):
+                message_blocks.append(xor_kernel(key_decimal, cipher_block, n))
 
-            for i in range(len(str_1)):
-                if(str_1[i] == str_2[i]):
-                    message += '0'
-                else:
-                    message += '1'
+        message = PackedBits.from_blocks(message_blocks, n)
+
+        return message if packed else message.to_str()
+
+    def encryptor(self, random_seed: int,
+                  processes: Optional[int] = 1) -> CPAStream:
+        """
+        Incremental encryption, see CPAStream
+        :param random_seed: ctr (IV for OFB and CBC)
+        :type random_seed: int
+        :param processes: worker processes computing CTR pads
+        :type processes: int
+        """
+        return CPAStream(self, random_seed, processes)
 
-        return message
+    def decryptor(self, processes: Optional[int] = 1) -> CPAStream:
+        """
+        Incremental decryption, see CPAStream
+        :param processes: worker processes computing CTR pads
+        :type processes: int
+        """
+        return CPAStream(self, None, processes)
 
+    def plaintext_view(self, cipher) -> PlaintextView:
+        """
+        Lazy plaintext of a ciphertext, decrypting blocks on access
+        :param cipher: ciphertext c
+        :type cipher: str | PackedBits
+        """
+        return PlaintextView(self, cipher)
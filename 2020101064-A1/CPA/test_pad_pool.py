@@ -0,0 +1,179 @@
+import gc
+import importlib.util
+import itertools
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ('CPA/CPA.py', 'CCA/CCA.py', '__init__.py')  # files carrying CPA
+
+
+def load(path: str):
+    """
+    Load an assignment module by file path (module folders are not packages)
+    :param path: path relative to the assignment root
+    :type path: str
+    """
+    spec = importlib.util.spec_from_file_location(
+        'pad_pool_' + os.path.basename(path).split('.')[0],
+        os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def wait_for(condition, timeout: float = 10):
+    """
+    Poll `condition` until it holds, failing after `timeout` seconds
+    """
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'timed out waiting for the pad worker'
+        time.sleep(0.01)
+
+
+def gated(seeds: list, gate: int, release):
+    """
+    Yield `seeds`, waiting for the `release` event before seeds[gate], so
+    that the pad worker cannot get past seeds[gate - 1] until the caller
+    allows it
+    """
+    for i, seed in enumerate(seeds):
+        if i == gate:
+            release.wait()
+        yield seed
+
+
+def check_pad_pool(CPA):
+    """
+    An unscheduled seed must miss without dropping any prepared pad, and
+    the next scheduled seed must still be served from the queue
+    """
+    x = CPA(16, 7919, 3, 123456, 'CTR')
+    message = '01' * 64
+    # exactly `depth` seeds, so the worker has nothing left to refill with
+    pool = x.prefetch_pads(range(100, 104), len(message) // 16, depth=4)
+
+    wait_for(lambda: pool.queue_depth == pool.depth)
+    depth = pool.queue_depth
+
+    x.enc(message, 999)
+    assert (pool.queue_depth, pool.misses) == (depth, 1), pool
+    assert x.enc(message, 100) == CPA(16, 7919, 3, 123456).enc(message, 100)
+    assert (pool.queue_depth, pool.hits) == (depth - 1, 1), pool
+    pool.close()
+
+
+def check_pad_pool_computing(CPA):
+    """
+    A seed enc reaches while the worker is computing its pad misses, and
+    the worker drops that pad instead of queueing it
+    """
+    started, finish = threading.Event(), threading.Event()
+
+    class SlowCPA(CPA):
+        def _pads(self, random_seed, num_blocks, processes, first_block=0):
+            # only the pool's worker thread is held up, not enc itself
+            worker = threading.current_thread() is not threading.main_thread()
+            if random_seed == 200 and worker:
+                started.set()
+                finish.wait()
+            return super()._pads(random_seed, num_blocks, processes,
+                                 first_block)
+
+    x = SlowCPA(16, 7919, 3, 123456, 'CTR')
+    message = '01' * 64
+    pool = x.prefetch_pads([200, 201], len(message) // 16)
+    started.wait()
+
+    assert pool.computing == (200, 0), pool.computing
+    assert x.enc(message, 200) == CPA(16, 7919, 3, 123456).enc(message, 200)
+    assert (pool.hits, pool.misses) == (0, 1), pool
+
+    finish.set()
+    pool.thread.join(10)
+    assert list(pool.ready) == [201], list(pool.ready)
+    x.enc(message, 201)
+    assert (pool.hits, pool.misses) == (1, 1), pool
+
+
+def check_pad_pool_ahead(CPA):
+    """
+    A seed enc asks for before the worker reaches it misses and is
+    remembered; the worker then skips it and drops the pads scheduled
+    before it, which enc has moved past
+    """
+    x = CPA(16, 7919, 3, 123456, 'CTR')
+    message = '01' * 64
+    release = threading.Event()
+    pool = x.prefetch_pads(gated([300, 301, 302, 303], 2, release),
+                           len(message) // 16)
+    wait_for(lambda: list(pool.ready) == [300, 301])
+
+    assert x.enc(message, 302) == CPA(16, 7919, 3, 123456).enc(message, 302)
+    assert (pool.misses, list(pool.ready)) == (1, [300, 301]), pool
+    assert 302 in pool.requested
+
+    release.set()
+    pool.thread.join(10)
+    assert list(pool.ready) == [303], list(pool.ready)
+    assert not pool.requested and pool.consumed == 2
+    x.enc(message, 303)
+    assert (pool.hits, pool.misses) == (1, 1), pool
+
+
+def check_pad_pool_closed(CPA):
+    """
+    After close, enc stops consulting the pool, so it counts no misses
+    """
+    x = CPA(16, 7919, 3, 123456, 'CTR')
+    message = '01' * 64
+    pool = x.prefetch_pads(range(400, 404), len(message) // 16)
+    wait_for(lambda: pool.queue_depth == 4)
+    pool.close()
+
+    for seed in (400, 401, 999):
+        assert x.enc(message, seed) == CPA(16, 7919, 3, 123456).enc(
+            message, seed)
+    assert x.pad_pool is None
+    assert (pool.hits, pool.misses) == (0, 0), pool
+
+
+def check_pad_pool_dropped(CPA):
+    """
+    The worker of a CPA dropped without close() exits, and a pool used as
+    a context manager is closed on exit
+    """
+    x = CPA(16, 7919, 3, 123456, 'CTR')
+    thread = x.prefetch_pads(itertools.count(), 2).thread
+    wait_for(lambda: x.pad_pool.queue_depth == x.pad_pool.depth)
+    del x
+    gc.collect()
+    thread.join(10)
+    assert not thread.is_alive()
+
+    x = CPA(16, 7919, 3, 123456, 'CTR')
+    with x.prefetch_pads(itertools.count(), 2) as pool:
+        pass
+    assert pool.closed
+    pool.thread.join(10)
+    assert not pool.thread.is_alive()
+
+
+CHECKS = (check_pad_pool, check_pad_pool_computing, check_pad_pool_ahead,
+          check_pad_pool_closed, check_pad_pool_dropped)
+
+
+def test_pad_pool():
+    for path in MODULES:
+        CPA = load(path).CPA
+        for check in CHECKS:
+            check(CPA)
+
+
+if __name__ == '__main__':
+    test_pad_pool()
+    print('PadPool checks passed')
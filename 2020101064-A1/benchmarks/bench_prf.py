@@ -0,0 +1,101 @@
+import importlib.util
+import os
+import sys
+import timeit
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load(path: str):
+    """
+    Load an assignment module by file path (module folders are not packages).
+    It is registered in sys.modules so that PRF worker processes can
+    unpickle its functions.
+    :param path: path relative to the assignment root
+    :type path: str
+    """
+    spec = importlib.util.spec_from_file_location(
+        os.path.basename(path).split('.')[0], os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def legacy_evaluate(PRG, prf, x: int) -> int:
+    """
+    PRF.evaluate as it was before the integer-domain walk: a bit-string
+    GGM walk with a fresh PRG per call
+    """
+    x_bin = bin(x)[2:].zfill(prf.security_parameter)
+
+    PRG_seed = prf.key
+
+    PRG_instance = PRG(prf.security_parameter, prf.generator,
+                       prf.prime_field, 2 * (prf.security_parameter))
+
+    for i in range(prf.security_parameter):
+        PRG_output = PRG_instance.generate(PRG_seed)
+
+        PRG_output_bin_1 = PRG_output[0: prf.security_parameter]
+        PRG_output_bin_2 = PRG_output[prf.security_parameter:]
+
+        if(x_bin[i] == '0'):
+            output = PRG_output_bin_1
+        else:
+            output = PRG_output_bin_2
+
+        PRG_seed = int(output, 2)
+
+    return PRG_seed
+
+
+def peak_bytes(function, *args) -> int:
+    """
+    Peak memory traced by tracemalloc while running function(*args)
+    """
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    module = load('PRF/PRF..py')
+    PRF, PRG = module.PRF, module.PRG
+
+    # (n, p, g, key): inputs/prf.csv parameters, then wider GGM trees
+    cases = [
+        (8, 191, 36, 150),
+        (12, 79, 14, 1389),
+        (32, 7919, 3, 123456),
+        (64, 7919, 3, 987654321),
+        (128, 65521, 17, 987654321),
+        (256, 65521, 17, 987654321),
+    ]
+
+    print('%5s %12s %12s %9s %14s %14s' % (
+        'n', 'legacy (s)', 'int (s)', 'speedup', 'legacy peak B', 'int peak B'))
+
+    for n, prime_field, generator, key in cases:
+        x = PRF(n, generator, prime_field, key)
+        inputs = [(key * 7919 + i * 104729) % (1 << n) for i in range(200)]
+        assert all(x.evaluate(v) == legacy_evaluate(PRG, x, v) for v in inputs)
+
+        legacy = min(timeit.repeat(
+            lambda: [legacy_evaluate(PRG, x, v) for v in inputs],
+            number=1, repeat=3))
+        walk = min(timeit.repeat(
+            lambda: [x.evaluate(v) for v in inputs], number=1, repeat=3))
+
+        legacy_peak = peak_bytes(legacy_evaluate, PRG, x, inputs[0])
+        walk_peak = peak_bytes(x.evaluate, inputs[0])
+
+        print('%5d %12.6f %12.6f %8.1fx %14d %14d' % (
+            n, legacy, walk, legacy / walk, legacy_peak, walk_peak))
+
+
+if __name__ == '__main__':
+    main()
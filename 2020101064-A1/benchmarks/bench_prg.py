@@ -0,0 +1,101 @@
+import importlib.util
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load(path: str):
+    """
+    Load an assignment module by file path (module folders are not packages).
+    It is registered in sys.modules so that PRF worker processes can
+    unpickle its functions.
+    :param path: path relative to the assignment root
+    :type path: str
+    """
+    spec = importlib.util.spec_from_file_location(
+        os.path.basename(path).split('.')[0], os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def legacy_generate(generator: int, prime_field: int, expansion_factor: int,
+                    seed: int) -> str:
+    """
+    PRG.generate as it was before the fixed-base engine
+    """
+    output_string = ''
+    y = seed
+
+    for i in range(expansion_factor):
+        curr_seed = y
+
+        if(y < (prime_field - 1) / 2):
+            output_string += '0'
+        else:
+            output_string += '1'
+
+        y = (generator ** curr_seed) % prime_field
+
+    return output_string
+
+
+def main():
+    module = load('PRG/PRG.py')
+    PRG, FixedBaseExp = module.PRG, module.FixedBaseExp
+
+    # (g, p, l(n), seed): inputs/prg.csv parameters, then larger primes where
+    # the comb table replaces the full exponent table
+    cases = [
+        (13, 41, 256, 17),
+        (4, 11, 256, 35),
+        (7, 17, 256, 125),
+        (3, 7919, 64, 1234),
+        (5, 104729, 32, 4321),
+        (2, 1000003, 8, 777),
+    ]
+
+    print('%10s %6s %12s %12s %9s' % ('p', 'l(n)', 'legacy (s)', 'engine (s)',
+                                      'speedup'))
+
+    for generator, prime_field, expansion_factor, seed in cases:
+        x = PRG(8, generator, prime_field, expansion_factor)
+        assert x.generate(seed) == legacy_generate(
+            generator, prime_field, expansion_factor, seed)
+
+        legacy = min(timeit.repeat(
+            lambda: legacy_generate(generator, prime_field,
+                                    expansion_factor, seed),
+            number=1, repeat=3))
+        engine = min(timeit.repeat(
+            lambda: x.generate(seed), number=1, repeat=3))
+
+        print('%10d %6d %12.6f %12.6f %8.1fx' % (
+            prime_field, expansion_factor, legacy, engine, legacy / engine))
+
+    # the legacy expression is out of reach for cryptographic sizes, so compare
+    # the comb table against the builtin three-argument pow there
+    print()
+    print('%10s %12s %12s %9s' % ('bits(p)', 'pow (s)', 'engine (s)',
+                                  'speedup'))
+
+    for prime_field in (2 ** 127 - 1, 2 ** 521 - 1):
+        engine = FixedBaseExp.shared(3, prime_field)
+        exponents = [pow(7, i, prime_field) for i in range(1, 201)]
+        assert all(engine.pow(e) == pow(3, e, prime_field) for e in exponents)
+
+        builtin = min(timeit.repeat(
+            lambda: [pow(3, e, prime_field) for e in exponents],
+            number=1, repeat=3))
+        table = min(timeit.repeat(
+            lambda: [engine.pow(e) for e in exponents], number=1, repeat=3))
+
+        print('%10d %12.6f %12.6f %8.1fx' % (
+            prime_field.bit_length(), builtin, table, builtin / table))
+
+
+if __name__ == '__main__':
+    main()